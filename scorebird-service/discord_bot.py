@@ -5,10 +5,11 @@ Tag the bot with an image attachment to parse and record a game.
 """
 
 import asyncio
-import base64
-import json
+import functools
 import os
 import random
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
@@ -16,8 +17,10 @@ from urllib.parse import quote
 
 import aiohttp
 import discord
+import orjson
 from discord import app_commands
 from dotenv import load_dotenv
+from rapidfuzz import fuzz, process
 
 # Load environment variables from .env file
 load_dotenv(Path(__file__).parent / ".env")
@@ -30,6 +33,69 @@ PLAYERS_JSON_PATH = os.getenv("PLAYERS_JSON_PATH", "/app/ScoreBird/signups/playe
 SITE_BASE_URL = os.getenv("SITE_BASE_URL", "https://wingstats.beatty.codes")
 GIPHY_API_KEY = os.getenv("GIPHY_API_KEY", "")
 
+# Giphy responses are cached per search term to avoid a roundtrip on every low score
+GIPHY_CACHE_TTL = 900  # seconds
+GIPHY_CACHE_SIZE = 5  # GIFs kept per term, picked at random for variety
+
+# Minimum normalized edit-distance similarity (0-100) for matching an OCR'd name
+# to a known name, and the shortest name fuzzy matching is attempted for
+FUZZY_MATCH_CUTOFF = 85
+FUZZY_MIN_LENGTH = 5
+
+# /players and /players/{name} responses are reused for this long;
+# recording a game clears them early
+LEADERBOARD_CACHE_TTL = 30  # seconds
+PLAYER_STATS_CACHE_TTL = 30  # seconds
+PLAYER_STATS_CACHE_SIZE = 256  # lookup names kept, least recently used evicted first
+
+# Low-score pings are queued per channel and sent at most this often,
+# keeping well under Discord's per-channel rate limit during bursts
+CHANNEL_SEND_INTERVAL = 60 / 30  # seconds
+
+# Max scorecards uploaded to ScoreBird at once
+MAX_CONCURRENT_PARSES = 8
+
+# Delay before writing players.json so bursts of /register calls share one write
+SAVE_DEBOUNCE_SECONDS = 2
+
+# (API field, ScoreBird score key) pairs used to build the /games payload
+SCORE_KEYS = (
+    ("birds", "bird_points"),
+    ("bonus", "bonus"),
+    ("endOfRound", "end_of_round"),
+    ("eggs", "egg"),
+    ("cachedFood", "cache"),
+    ("tuckedCards", "tuck"),
+    ("nectar", "nectar"),
+    ("duetTokens", "duet_pts"),
+)
+_EMPTY_SCORES: dict = {}
+
+# Medals indexed by rank: suffixes for the game recorded message,
+# prefixes for the leaderboard
+_MEDALS = ("", " :first_place:", " :second_place:", " :third_place:")
+_MEDALS_LB = ("", ":first_place: ", ":second_place: ", ":third_place: ")
+
+# (phrase, Giphy search term) pairs for low-score pings
+LOW_SCORE_PHRASES = (
+    ("you almost had it buddy maybe next time", "almost had it"),
+    ("looks like early bird does not catch the worm", "early bird fail"),
+    ("how disappointing!", "disappointed"),
+    ("did you even try?", "did you even try"),
+    ("the birds are crying for you", "crying bird"),
+    ("that's not flying, that's falling with style", "falling with style"),
+    ("even a penguin could score higher", "penguin fail"),
+    ("skill issue", "skill issue"),
+    ("maybe try checkers instead", "you stink"),
+    ("the nest egg is looking a little empty", "empty nest"),
+    ("were you playing with your eyes closed?", "eyes closed"),
+    ("not your finest migration", "bad migration"),
+    ("even garrett could've scored better than this", "you suck"),
+    ("honk honk", "clown"),
+)
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
 # Discord intents
 intents = discord.Intents.default()
 intents.message_content = True
@@ -37,56 +103,196 @@ intents.messages = True
 intents.members = True  # Required to look up guild members for pings
 
 
+def normalize_wingspan_name(name: str) -> str:
+    """Normalize a Wingspan name for lookups (case-insensitive, trimmed)."""
+    return name.lower().strip()
+
+
+def normalize_discord_username(username: str) -> str:
+    """Normalize a Discord username for lookups (lowercase, no leading dots)."""
+    return username.lower().lstrip(".")
+
+
+_iso_now_sec: Optional[int] = None
+_iso_now_str = ""
+
+
+def _iso_now() -> str:
+    """Current UTC time as ISO 8601, reused for calls within the same second."""
+    global _iso_now_sec, _iso_now_str
+    now_sec = int(time.time())
+    if now_sec != _iso_now_sec:
+        _iso_now_sec = now_sec
+        _iso_now_str = datetime.now(timezone.utc).isoformat()
+    return _iso_now_str
+
+
+@functools.lru_cache(maxsize=512)
+def _player_url(name: str) -> str:
+    """API URL for a player's stats."""
+    return f"{API_BASE_URL}/players/{quote(name, safe='')}"
+
+
+def _total_score(game_player: dict) -> int:
+    """Sort key for a player entry from the /games API."""
+    return game_player.get("totalScore") or 0
+
+
+@functools.lru_cache(maxsize=1024)
+def format_played_date(played_at: str) -> str:
+    """Format an ISO timestamp like 2024-01-05T... as 'Jan 05, 2024'."""
+    y, m, d = played_at[:4], played_at[5:7], played_at[8:10]
+    if (len(played_at) >= 10 and played_at[4] == "-" and played_at[7] == "-"
+            and y.isdigit() and m.isdigit() and d.isdigit() and 1 <= int(m) <= 12):
+        return f"{MONTHS[int(m) - 1]} {d}, {y}"
+    return played_at[:10] if len(played_at) >= 10 else played_at
+
+
 class WingStatsBot(discord.Client):
     def __init__(self):
         super().__init__(intents=intents)
         self.tree = app_commands.CommandTree(self)
         self.player_mappings: dict[str, list[str]] = {}
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        # Lookup indexes derived from player_mappings, see _rebuild_index
+        self._ws_index: dict[str, tuple[str, str]] = {}
+        self._discord_index: dict[str, list[str]] = {}
+        self._canonical_set: set[str] = set()
+        self._giphy_cache: dict[str, tuple[float, list[str]]] = {}
+        self._leaderboard_cache: Optional[tuple[float, dict]] = None
+        self._player_stats_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._send_queues: dict[int, asyncio.Queue] = {}
+        self._send_tasks: dict[int, asyncio.Task] = {}
+        self._ocr_sem = asyncio.Semaphore(MAX_CONCURRENT_PARSES)
+        # mtime of players.json when last read/written, and the last bytes written
+        self._players_mtime: Optional[int] = None
+        self._players_saved: Optional[bytes] = None
+        self._save_pending = asyncio.Event()
+        self._save_task: Optional[asyncio.Task] = None
         self._load_player_mappings()
 
     def _load_player_mappings(self):
         """Load Discord username to Wingspan name mappings."""
         try:
             if os.path.exists(PLAYERS_JSON_PATH):
-                with open(PLAYERS_JSON_PATH, "r") as f:
-                    self.player_mappings = json.load(f)
+                mtime = os.stat(PLAYERS_JSON_PATH).st_mtime_ns
+                self.player_mappings = orjson.loads(Path(PLAYERS_JSON_PATH).read_bytes())
+                self._players_mtime = mtime
                 print(f"Loaded {len(self.player_mappings)} player mappings")
             else:
                 print(f"No players.json found at {PLAYERS_JSON_PATH}")
         except Exception as e:
             print(f"Failed to load player mappings: {e}")
+        self._rebuild_index()
+
+    def _maybe_reload(self):
+        """Reload player mappings only if players.json changed on disk."""
+        try:
+            mtime = os.stat(PLAYERS_JSON_PATH).st_mtime_ns
+        except OSError:
+            return
+        # Don't clobber in-memory changes that haven't been written yet
+        if mtime != self._players_mtime and not self._save_pending.is_set():
+            self._load_player_mappings()
 
     def _save_player_mappings(self):
-        """Save player mappings back to file."""
+        """Schedule player mappings to be saved back to file."""
+        self._rebuild_index()
+        self._save_pending.set()
+
+    async def _save_loop(self):
+        """Background task that coalesces pending saves into a single write."""
+        while True:
+            await self._save_pending.wait()
+            await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+            self._save_pending.clear()
+            await self._flush_player_mappings()
+
+    async def _flush_player_mappings(self):
+        """Write player mappings to file if they changed since the last write."""
         try:
-            with open(PLAYERS_JSON_PATH, "w") as f:
-                json.dump(self.player_mappings, f, indent=2)
+            # Serialize compactly on the event loop so the dict can't change mid-dump
+            data = orjson.dumps(self.player_mappings)
+            if data != self._players_saved:
+                await asyncio.to_thread(self._write_players_json, data)
+                self._players_saved = data
         except Exception as e:
             print(f"Failed to save player mappings: {e}")
 
+    def _write_players_json(self, data: bytes):
+        """Write serialized player mappings to players.json."""
+        # Write to a temp file and swap it in so readers never see a partial file
+        tmp_path = PLAYERS_JSON_PATH + ".tmp"
+        Path(tmp_path).write_bytes(data)
+        try:
+            os.replace(tmp_path, PLAYERS_JSON_PATH)
+        except OSError:
+            # players.json is bind-mounted as a single file in docker-compose,
+            # which can't be replaced; fall back to writing in place
+            os.unlink(tmp_path)
+            Path(PLAYERS_JSON_PATH).write_bytes(data)
+        self._players_mtime = os.stat(PLAYERS_JSON_PATH).st_mtime_ns
+
+    def _rebuild_index(self):
+        """
+        Rebuild the name lookup indexes from player_mappings.
+        Stored names are normalized once here so lookups only normalize their input.
+        """
+        ws_index: dict[str, tuple[str, str]] = {}
+        discord_index: dict[str, list[str]] = {}
+        for discord_user, data in self.player_mappings.items():
+            wingspan_names = data.get("wingspan name", [])
+            discord_index.setdefault(normalize_discord_username(discord_user), wingspan_names)
+            for ws_name in wingspan_names:
+                # First mapping wins, matching the original scan order
+                ws_index.setdefault(normalize_wingspan_name(ws_name), (wingspan_names[0], discord_user))
+        # Canonical names that the index itself resolves to themselves; a name that
+        # an earlier mapping claims as an alias must still go through the index
+        self._canonical_set = {
+            canonical for canonical, _ in ws_index.values()
+            if ws_index[normalize_wingspan_name(canonical)][0] == canonical
+        }
+        self._ws_index = ws_index
+        self._discord_index = discord_index
+
     def get_wingspan_names(self, discord_username: str) -> list[str]:
         """Get Wingspan names for a Discord user."""
-        # Normalize username (lowercase, no leading dots)
-        normalized = discord_username.lower().lstrip(".")
-
-        for key, value in self.player_mappings.items():
-            if key.lower().lstrip(".") == normalized:
-                return value.get("wingspan name", [])
-        return []
+        self._maybe_reload()
+        return self._discord_index.get(normalize_discord_username(discord_username), [])
 
     def find_best_player_match(self, parsed_name: str) -> Optional[str]:
         """
         Try to match a parsed player name to a known Wingspan name.
+        Exact matches are tried first; fuzzy matching only handles OCR typos.
         Returns the canonical name if found, otherwise the original.
         """
-        parsed_lower = parsed_name.lower().strip()
-
-        for discord_user, data in self.player_mappings.items():
-            wingspan_names = data.get("wingspan name", [])
-            for ws_name in wingspan_names:
-                if ws_name.lower() == parsed_lower:
-                    # Return the first (canonical) Wingspan name
-                    return wingspan_names[0]
+        # OCR'd names are usually already canonical, skip normalizing them
+        if parsed_name in self._canonical_set:
+            return parsed_name
+
+        parsed_lower = normalize_wingspan_name(parsed_name)
+        hit = self._ws_index.get(parsed_lower)
+        if hit:
+            # Index stores the first (canonical) Wingspan name
+            return hit[0]
+
+        # Short names are too easy to confuse (e.g. an unregistered "Bob" vs "Bobby")
+        if len(parsed_lower) < FUZZY_MIN_LENGTH:
+            return parsed_name
+
+        # fuzz.ratio is plain edit-distance similarity; unlike the default WRatio
+        # it doesn't reward one name being a substring of another
+        matches = process.extract(
+            parsed_lower,
+            self._ws_index.keys(),
+            scorer=fuzz.ratio,
+            score_cutoff=FUZZY_MATCH_CUTOFF,
+            limit=None,
+        )
+        canonical_names = {self._ws_index[name][0] for name, _, _ in matches}
+        # Only accept a fuzzy hit that points at exactly one player
+        if len(canonical_names) == 1:
+            return canonical_names.pop()
 
         return parsed_name
 
@@ -94,21 +300,103 @@ class WingStatsBot(discord.Client):
         """
         Reverse lookup: find Discord username from a Wingspan name.
         """
-        ws_lower = wingspan_name.lower().strip()
+        hit = self._ws_index.get(normalize_wingspan_name(wingspan_name))
+        return hit[1] if hit else None
 
-        for discord_user, data in self.player_mappings.items():
-            wingspan_names = data.get("wingspan name", [])
-            for ws_name in wingspan_names:
-                if ws_name.lower() == ws_lower:
-                    return discord_user
+    async def _get_gif(self, term: str) -> str:
+        """
+        Get a random GIF URL for a search term, served from a short-lived cache.
+        Returns an empty string if no GIF could be fetched.
+        """
+        cached = self._giphy_cache.get(term)
+        if cached and time.monotonic() - cached[0] < GIPHY_CACHE_TTL:
+            fetched_at, urls = cached
+            if len(urls) >= GIPHY_CACHE_SIZE:
+                return random.choice(urls)
+        else:
+            fetched_at, urls = time.monotonic(), []
+
+        if not GIPHY_API_KEY:
+            return random.choice(urls) if urls else ""
+
+        try:
+            params = {
+                "api_key": GIPHY_API_KEY,
+                "tag": term,
+                "rating": "pg-13",
+            }
+            async with self.http_session.get("https://api.giphy.com/v1/gifs/random", params=params) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    gif_url = data.get("data", {}).get("images", {}).get("original", {}).get("url", "")
+                    if gif_url:
+                        urls.append(gif_url)
+                        self._giphy_cache[term] = (fetched_at, urls)
+                        return gif_url
+                else:
+                    print(f"Giphy API returned status {resp.status}: {await resp.text()}")
+        except Exception as e:
+            print(f"Error fetching GIF from Giphy: {e}")
+
+        return random.choice(urls) if urls else ""
 
-        return None
+    def queue_channel_message(self, channel: discord.abc.Messageable, content: str):
+        """Queue a message to be sent to a channel by its rate-limited sender task."""
+        queue = self._send_queues.get(channel.id)
+        if queue is None:
+            queue = self._send_queues[channel.id] = asyncio.Queue()
+            self._send_tasks[channel.id] = asyncio.create_task(self._channel_sender(channel.id, queue))
+        queue.put_nowait((channel, content))
+
+    async def _channel_sender(self, channel_id: int, queue: asyncio.Queue):
+        """
+        Send queued messages to a channel one at a time, spaced out to avoid 429s.
+        Exits once the queue is drained; the next queued message starts a new sender.
+        """
+        try:
+            # The empty check and cleanup run without awaiting in between,
+            # so a message can't be queued to a sender that is exiting
+            while not queue.empty():
+                channel, content = queue.get_nowait()
+                try:
+                    await channel.send(content)
+                except Exception as e:
+                    print(f"Failed to send queued message to channel {channel_id}: {e}")
+                await asyncio.sleep(CHANNEL_SEND_INTERVAL)
+        finally:
+            self._send_queues.pop(channel_id, None)
+            self._send_tasks.pop(channel_id, None)
 
     async def setup_hook(self):
-        """Called when bot is ready, syncs slash commands."""
+        """Called when bot is ready, creates the HTTP session and syncs slash commands."""
+        # One shared session so connections to ScoreBird/API/Giphy are kept alive
+        self.http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=128,
+                limit_per_host=64,
+                ttl_dns_cache=600,  # Only a handful of hosts, keep their DNS entries around
+                keepalive_timeout=75,
+                enable_cleanup_closed=True,
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+        self._save_task = asyncio.create_task(self._save_loop())
         await self.tree.sync()
         print("Slash commands synced!")
 
+    async def close(self):
+        """Flush pending saves and close the shared HTTP session before shutting down."""
+        if self._save_task is not None:
+            self._save_task.cancel()
+        for task in list(self._send_tasks.values()):
+            task.cancel()
+        if self._save_pending.is_set():
+            self._save_pending.clear()
+            await self._flush_player_mappings()
+        if self.http_session is not None:
+            await self.http_session.close()
+        await super().close()
+
 
 bot = WingStatsBot()
 
@@ -124,12 +412,12 @@ async def on_ready():
 
 @bot.event
 async def on_message(message: discord.Message):
-    # Ignore messages from the bot itself
-    if message.author == bot.user:
+    # Ignore bots (including ourselves), system messages, and DMs before doing any work
+    if message.author.bot or message.is_system() or not message.guild:
         return
 
     # Check if bot is mentioned
-    if bot.user not in message.mentions:
+    if bot.user.id not in {u.id for u in message.mentions}:
         return
 
     # Check for image attachments in the current message
@@ -164,212 +452,191 @@ async def on_message(message: discord.Message):
     processing_msg = await message.reply("Parsing scorecard... please wait.")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            # Download the image
-            async with session.get(attachment.url) as resp:
-                if resp.status != 200:
+        session = bot.http_session
+        # Limit concurrent uploads so a flood of scorecards doesn't stampede ScoreBird
+        async with bot._ocr_sem:
+            # Download the image and stream it straight to ScoreBird as a multipart upload
+            async with session.get(attachment.url, timeout=aiohttp.ClientTimeout(total=60)) as download:
+                if download.status != 200:
                     await processing_msg.edit(content="Failed to download image.")
                     return
-                image_bytes = await resp.read()
-
-            # Convert to base64
-            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-
-            # Call ScoreBird parse endpoint
-            async with session.post(
-                f"{SCOREBIRD_URL}/parse",
-                json={"image": image_b64},
-                timeout=aiohttp.ClientTimeout(total=60)
-            ) as resp:
-                if resp.status != 200:
-                    error_text = await resp.text()
-                    await processing_msg.edit(
-                        content=f"ScoreBird parsing failed: {error_text}"
-                    )
-                    return
-                parse_result = await resp.json()
 
-            if not parse_result.get("success"):
-                error_detail = parse_result.get("error", "Unknown error")
-                await processing_msg.edit(
-                    content=f"Could not parse the scorecard: {error_detail}"
+                form = aiohttp.FormData()
+                form.add_field(
+                    "image",
+                    download.content,
+                    filename=attachment.filename,
+                    content_type=attachment.content_type,
                 )
-                return
 
-            players = parse_result.get("players", [])
-            winners = parse_result.get("winners", [])
+                # Call ScoreBird parse endpoint
+                async with session.post(
+                    f"{SCOREBIRD_URL}/parse",
+                    data=form,
+                    timeout=aiohttp.ClientTimeout(total=60)
+                ) as resp:
+                    if resp.status != 200:
+                        error_text = await resp.text()
+                        await processing_msg.edit(
+                            content=f"ScoreBird parsing failed: {error_text}"
+                        )
+                        return
+                    parse_result = await resp.json()
 
-            if not players:
-                await processing_msg.edit(
-                    content="No players found in the scorecard. Is this a valid Wingspan score screen?"
-                )
-                return
+        if not parse_result.get("success"):
+            error_detail = parse_result.get("error", "Unknown error")
+            await processing_msg.edit(
+                content=f"Could not parse the scorecard: {error_detail}"
+            )
+            return
 
-            # Map parsed names to known player names
-            for player in players:
-                original_name = player["name"]
-                matched_name = bot.find_best_player_match(original_name)
-                player["name"] = matched_name
-
-            # Transform scores to API format
-            api_players = []
-            for player in players:
-                scores = player.get("scores", {})
-                api_players.append({
-                    "name": player["name"],
-                    "birds": scores.get("bird_points") or 0,
-                    "bonus": scores.get("bonus") or 0,
-                    "endOfRound": scores.get("end_of_round") or 0,
-                    "eggs": scores.get("egg") or 0,
-                    "cachedFood": scores.get("cache") or 0,
-                    "tuckedCards": scores.get("tuck") or 0,
-                    "nectar": scores.get("nectar") or 0,
-                    "duetTokens": scores.get("duet_pts") or 0,
-                })
-
-            # Check for players whose score details failed to parse
-            manual_entry_players = []
-            for player, api_player in zip(players, api_players):
-                total = player.get("total", 0)
-                detail_sum = (api_player["birds"] + api_player["bonus"] + api_player["endOfRound"] +
-                              api_player["eggs"] + api_player["cachedFood"] + api_player["tuckedCards"] +
-                              api_player["nectar"] + api_player["duetTokens"])
-                if total > 0 and detail_sum == 0:
-                    manual_entry_players.append(player["name"])
-
-            # Create the game via API
-            game_data = {
-                "playedAt": datetime.now(timezone.utc).isoformat(),
-                "players": api_players,
-                "uploadedBy": f"Discord:{message.author.name}",
-            }
+        players = parse_result.get("players", [])
+        winners = parse_result.get("winners", [])
 
-            async with session.post(
-                f"{API_BASE_URL}/games",
-                json=game_data,
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as resp:
-                if resp.status not in (200, 201):
-                    error_text = await resp.text()
-                    await processing_msg.edit(
-                        content=f"Failed to save game: {error_text}"
-                    )
-                    return
-                game_response = await resp.json()
+        if not players:
+            await processing_msg.edit(
+                content="No players found in the scorecard. Is this a valid Wingspan score screen?"
+            )
+            return
 
-            game = game_response.get("game", {})
-            game_id = game.get("id", "unknown")
+        # Map parsed names to known player names, and materialize totals once.
+        # seen caches matches so names that are both players and winners are matched once.
+        seen: dict[str, str] = {}
+
+        def match_name(name: str) -> str:
+            matched = seen.get(name)
+            if matched is None:
+                matched = seen[name] = bot.find_best_player_match(name)
+            return matched
+
+        for player in players:
+            player["name"] = match_name(player["name"])
+            player["_total"] = player.get("total") or 0
+
+        # Transform scores to API format
+        api_players = []
+        for player in players:
+            scores = player.get("scores") or _EMPTY_SCORES
+            api_player = {api_key: scores.get(score_key) or 0 for api_key, score_key in SCORE_KEYS}
+            api_player["name"] = player["name"]
+            api_players.append(api_player)
+
+        # Check for players whose score details failed to parse
+        manual_entry_players = []
+        for player, api_player in zip(players, api_players):
+            total = player["_total"]
+            detail_sum = sum(api_player[api_key] for api_key, _ in SCORE_KEYS)
+            if total > 0 and detail_sum == 0:
+                manual_entry_players.append(player["name"])
+
+        # Build response message
+        response_lines = ["**Game Recorded!**\n"]
+
+        # Sort players by total score descending
+        sorted_players = sorted(
+            players,
+            key=lambda p: p["_total"],
+            reverse=True
+        )
 
-            # Build response message
-            response_lines = ["**Game Recorded!**\n"]
+        # Guild members by normalized username, built on the first low score only
+        members_by_name: Optional[dict[str, discord.Member]] = None
 
-            # Sort players by total score descending
-            sorted_players = sorted(
-                players,
-                key=lambda p: p.get("total", 0),
-                reverse=True
+        # Single pass: rank lines and low-score pings (players who scored under 100)
+        low_score_mentions = []
+        # Calculate ranks with tie handling (competition ranking: 1, 1, 3)
+        prev_score = None
+        rank = 0
+        for i, player in enumerate(sorted_players, 1):
+            score = player["_total"]
+            if score != prev_score:
+                rank = i  # New rank when score differs
+            prev_score = score
+
+            medal = _MEDALS[rank] if rank < 4 else ""
+            response_lines.append(
+                f"{rank}. **{player['name']}** - {score} pts{medal}"
             )
 
-            # Calculate ranks with tie handling (competition ranking: 1, 1, 3)
-            prev_score = None
-            rank = 0
-            for i, player in enumerate(sorted_players, 1):
-                score = player.get('total', 0)
-                if score != prev_score:
-                    rank = i  # New rank when score differs
-                prev_score = score
-
-                medal = ""
-                if rank == 1:
-                    medal = " :first_place:"
-                elif rank == 2:
-                    medal = " :second_place:"
-                elif rank == 3:
-                    medal = " :third_place:"
-
-                response_lines.append(
-                    f"{rank}. **{player['name']}** - {score} pts{medal}"
+            if score < 100:
+                print(f"Low score detected: {player['name']} with {score} pts")
+                discord_username = bot.get_discord_username_for_wingspan_name(player["name"])
+                if discord_username:
+                    if members_by_name is None:
+                        members_by_name = {
+                            normalize_discord_username(m.name): m for m in message.guild.members
+                        }
+                    member = members_by_name.get(normalize_discord_username(discord_username))
+                    if member:
+                        low_score_mentions.append(member.mention)
+                    else:
+                        print(f"Could not find guild member for username: {discord_username}")
+                else:
+                    print(f"No discord username mapping found for: {player['name']}")
+
+        # Start the Giphy lookup now so it overlaps with saving the game
+        gif_task = None
+        print(f"Low score mentions: {len(low_score_mentions)}")
+        if low_score_mentions:
+            phrase, search_term = random.choice(LOW_SCORE_PHRASES)
+            print(f"Searching Giphy for: {search_term}")
+            gif_task = asyncio.create_task(bot._get_gif(search_term))
+
+        # Create the game via API
+        game_data = {
+            "playedAt": _iso_now(),
+            "players": api_players,
+            "uploadedBy": f"Discord:{message.author.name}",
+        }
+
+        async with session.post(
+            f"{API_BASE_URL}/games",
+            data=orjson.dumps(game_data),
+            headers={"Content-Type": "application/json"}
+        ) as resp:
+            if resp.status not in (200, 201):
+                error_text = await resp.text()
+                if gif_task:
+                    gif_task.cancel()
+                await processing_msg.edit(
+                    content=f"Failed to save game: {error_text}"
                 )
+                return
+            game_response = await resp.json()
 
-            # Ping players who scored under 100
-            low_score_mentions = []
-            for player in sorted_players:
-                if player.get("total", 0) < 100:
-                    print(f"Low score detected: {player['name']} with {player.get('total', 0)} pts")
-                    discord_username = bot.get_discord_username_for_wingspan_name(player["name"])
-                    if discord_username and message.guild:
-                        member = discord.utils.find(
-                            lambda m: m.name.lower().lstrip(".") == discord_username.lower().lstrip("."),
-                            message.guild.members
-                        )
-                        if member:
-                            low_score_mentions.append(member.mention)
-                        else:
-                            print(f"Could not find guild member for username: {discord_username}")
-                    else:
-                        print(f"No discord username mapping found for: {player['name']}")
+        # Leaderboard and player stats changed, drop the cached copies
+        bot._leaderboard_cache = None
+        bot._player_stats_cache.clear()
 
-            # Update winners list with mapped names
-            mapped_winners = [bot.find_best_player_match(w) for w in winners]
-            if mapped_winners:
-                response_lines.append(f"\n:trophy: Winner: **{', '.join(mapped_winners)}**")
+        game = game_response.get("game", {})
+        game_id = game.get("id", "unknown")
 
-            game_url = f"{SITE_BASE_URL}/games/{game_id}"
-            response_lines.append(f"\n:link: {game_url}")
+        # Update winners list with mapped names
+        mapped_winners = [match_name(w) for w in winners]
+        if mapped_winners:
+            response_lines.append(f"\n:trophy: Winner: **{', '.join(mapped_winners)}**")
 
-            await processing_msg.edit(content="\n".join(response_lines))
+        game_url = f"{SITE_BASE_URL}/games/{game_id}"
+        response_lines.append(f"\n:link: {game_url}")
 
-            if manual_entry_players:
-                names = ", ".join(f"**{n}**" for n in manual_entry_players)
-                await message.channel.send(
-                    f"\u26a0\ufe0f Score details could not be parsed for {names}. "
-                    f"Please enter their scores manually: {game_url}"
-                )
+        await processing_msg.edit(content="\n".join(response_lines))
 
-            print(f"Low score mentions: {len(low_score_mentions)}")
-            if low_score_mentions:
-                low_score_phrases = [
-                    ("you almost had it buddy maybe next time", "almost had it"),
-                    ("looks like early bird does not catch the worm", "early bird fail"),
-                    ("how disappointing!", "disappointed"),
-                    ("did you even try?", "did you even try"),
-                    ("the birds are crying for you", "crying bird"),
-                    ("that's not flying, that's falling with style", "falling with style"),
-                    ("even a penguin could score higher", "penguin fail"),
-                    ("skill issue", "skill issue"),
-                    ("maybe try checkers instead", "you stink"),
-                    ("the nest egg is looking a little empty", "empty nest"),
-                    ("were you playing with your eyes closed?", "eyes closed"),
-                    ("not your finest migration", "bad migration"),
-                    ("even garrett could've scored better than this", "you suck"),
-                    ("honk honk", "clown"),
-                ]
-                phrase, search_term = random.choice(low_score_phrases)
-                gif_url = ""
-                print(f"Searching Giphy for: {search_term}")
-                if GIPHY_API_KEY:
-                    try:
-                        async with aiohttp.ClientSession() as session:
-                            params = {
-                                "api_key": GIPHY_API_KEY,
-                                "tag": search_term,
-                                "rating": "pg-13",
-                            }
-                            async with session.get("https://api.giphy.com/v1/gifs/random", params=params) as resp:
-                                if resp.status == 200:
-                                    data = await resp.json()
-                                    gif_url = data.get("data", {}).get("images", {}).get("original", {}).get("url", "")
-                                else:
-                                    print(f"Giphy API returned status {resp.status}: {await resp.text()}")
-                    except Exception as e:
-                        print(f"Error fetching GIF from Giphy: {e}")
-                msg = f"{' '.join(low_score_mentions)} {phrase}"
-                if gif_url:
-                    msg += f"\n{gif_url}"
-                    print(f"Sending GIF: {gif_url}")
-                else:
-                    print("No GIF URL obtained, sending message without GIF")
-                await message.channel.send(msg)
+        if manual_entry_players:
+            names = ", ".join(f"**{n}**" for n in manual_entry_players)
+            await message.channel.send(
+                f"\u26a0\ufe0f Score details could not be parsed for {names}. "
+                f"Please enter their scores manually: {game_url}"
+            )
+
+        if gif_task:
+            gif_url = await gif_task
+            msg = f"{' '.join(low_score_mentions)} {phrase}"
+            if gif_url:
+                msg += f"\n{gif_url}"
+                print(f"Sending GIF: {gif_url}")
+            else:
+                print("No GIF URL obtained, sending message without GIF")
+            bot.queue_channel_message(message.channel, msg)
 
     except asyncio.TimeoutError:
         await processing_msg.edit(content="Request timed out. Please try again.")
@@ -414,10 +681,14 @@ async def stats_command(
         lookup_name = interaction.user.name.lower()
 
     try:
-        async with aiohttp.ClientSession() as session:
+        cached = bot._player_stats_cache.get(lookup_name)
+        if cached and time.monotonic() - cached[0] < PLAYER_STATS_CACHE_TTL:
+            bot._player_stats_cache.move_to_end(lookup_name)
+            data = cached[1]
+        else:
+            session = bot.http_session
             async with session.get(
-                f"{API_BASE_URL}/players/{quote(lookup_name, safe='')}",
-                timeout=aiohttp.ClientTimeout(total=30)
+                _player_url(lookup_name)
             ) as resp:
                 if resp.status == 404:
                     if player_name:
@@ -432,6 +703,10 @@ async def stats_command(
                     await interaction.followup.send("Failed to fetch player stats.")
                     return
                 data = await resp.json()
+            bot._player_stats_cache[lookup_name] = (time.monotonic(), data)
+            bot._player_stats_cache.move_to_end(lookup_name)
+            if len(bot._player_stats_cache) > PLAYER_STATS_CACHE_SIZE:
+                bot._player_stats_cache.popitem(last=False)
 
         stats = data.get("stats", {})
         identity = data.get("identity", {})
@@ -472,15 +747,19 @@ async def leaderboard_command(interaction: discord.Interaction):
     await interaction.response.defer()
 
     try:
-        async with aiohttp.ClientSession() as session:
+        cached = bot._leaderboard_cache
+        if cached and time.monotonic() - cached[0] < LEADERBOARD_CACHE_TTL:
+            data = cached[1]
+        else:
+            session = bot.http_session
             async with session.get(
-                f"{API_BASE_URL}/players",
-                timeout=aiohttp.ClientTimeout(total=30)
+                f"{API_BASE_URL}/players"
             ) as resp:
                 if resp.status != 200:
                     await interaction.followup.send("Failed to fetch leaderboard.")
                     return
                 data = await resp.json()
+            bot._leaderboard_cache = (time.monotonic(), data)
 
         players = data.get("players", [])[:10]  # Top 10
 
@@ -511,13 +790,7 @@ async def leaderboard_command(interaction: discord.Interaction):
                 rank = i
             prev_avg = avg_score
 
-            medal = ""
-            if rank == 1:
-                medal = ":first_place: "
-            elif rank == 2:
-                medal = ":second_place: "
-            elif rank == 3:
-                medal = ":third_place: "
+            medal = _MEDALS_LB[rank] if rank < 4 else ""
 
             # Show account count if multiple
             account_info = f" ({len(aliases)} accounts)" if len(aliases) > 1 else ""
@@ -592,15 +865,14 @@ async def recent_command(interaction: discord.Interaction, count: int = 5):
     count = min(max(1, count), 10)  # Clamp between 1 and 10
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{API_BASE_URL}/games?limit={count}",
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as resp:
-                if resp.status != 200:
-                    await interaction.followup.send("Failed to fetch recent games.")
-                    return
-                data = await resp.json()
+        session = bot.http_session
+        async with session.get(
+            f"{API_BASE_URL}/games?limit={count}"
+        ) as resp:
+            if resp.status != 200:
+                await interaction.followup.send("Failed to fetch recent games.")
+                return
+            data = await resp.json()
 
         games = data.get("games", [])
 
@@ -616,26 +888,17 @@ async def recent_command(interaction: discord.Interaction, count: int = 5):
         for game in games:
             players = game.get("players", [])
             # Sort by score
-            players_sorted = sorted(
-                players,
-                key=lambda p: p.get("totalScore", 0),
-                reverse=True
-            )
+            players_sorted = sorted(players, key=_total_score, reverse=True)
 
             player_lines = []
             for p in players_sorted:
                 winner_mark = " :trophy:" if p.get("isWinner") else ""
                 player_lines.append(
-                    f"{p.get('playerName', 'Unknown')}: {p.get('totalScore', 0)}{winner_mark}"
+                    f"{p.get('playerName', 'Unknown')}: {_total_score(p)}{winner_mark}"
                 )
 
             played_at = game.get("playedAt", "Unknown date")
-            # Parse and format date
-            try:
-                dt = datetime.fromisoformat(played_at.replace("Z", "+00:00"))
-                date_str = dt.strftime("%b %d, %Y")
-            except:
-                date_str = played_at[:10] if len(played_at) >= 10 else played_at
+            date_str = format_played_date(played_at)
 
             embed.add_field(
                 name=date_str,
@@ -3,13 +3,25 @@ ScoreBird FastAPI Service
 Wraps the ScoreBird library to parse Wingspan score screenshots.
 """
 
+import asyncio
 import base64
+import functools
+import hashlib
 import io
+import json
 import os
+import tempfile
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import Optional
-from fastapi import FastAPI, HTTPException
+
+import cv2
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from PIL import Image
 
 # Import ScoreBird - fail if not available
@@ -22,10 +34,23 @@ except ImportError as e:
 except Exception as e:
     raise RuntimeError(f"ScoreBird error: {type(e).__name__}: {e}")
 
+# OCR runs in a bounded thread pool so it doesn't block the event loop
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the OCR thread pool on startup and shut it down on exit."""
+    app.state.ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS)
+    yield
+    app.state.ocr_pool.shutdown(wait=False)
+
+
 app = FastAPI(
     title="ScoreBird Service",
     description="Parse Wingspan score screenshots using OCR",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware for frontend access
@@ -38,7 +63,44 @@ app.add_middleware(
 )
 
 
-class ParseRequest(BaseModel):
+# Parse results keyed by SHA-256 of the image bytes, so re-uploads skip OCR
+PARSE_CACHE_SIZE = 256
+_parse_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+# Reject oversized uploads before decoding them
+MAX_IMAGE_BYTES = 15_000_000
+MAX_BASE64_LENGTH = 20_000_000
+# Whole request body caps, leaving room for form fields / JSON around the image
+MAX_MULTIPART_BODY_BYTES = MAX_IMAGE_BYTES + 1_000_000
+MAX_JSON_BODY_BYTES = MAX_BASE64_LENGTH + 1_000_000
+
+# Longest edge images are downscaled to before OCR; scorecards stay legible
+# at this size and OCR cost scales with pixel count
+MAX_IMAGE_EDGE = 1600
+
+# (response score key, ScoreBird detail key) pairs
+SCORE_DETAIL_KEYS = (
+    ("bird_points", "bird_pts"),
+    ("bonus", "bonus_pts"),
+    ("end_of_round", "eor_pts"),
+    ("egg", "egg_pts"),
+    ("cache", "cache_pts"),
+    ("tuck", "tuck_pts"),
+    ("nectar", "nectar_pts"),
+    ("duet_pts", "duet_pts"),
+)
+
+# Formats OpenCV can read directly, so uploads in these formats are handed
+# to ScoreBird as-is instead of being re-encoded to PNG
+CV2_READABLE_FORMATS = {"PNG", "JPEG", "WEBP", "BMP", "TIFF"}
+
+
+class ParseOptions(BaseModel):
+    downscale: bool = True  # Shrink oversized images before OCR
+    debug: bool = False  # Include an annotated WebP image of the parsed regions
+
+
+class ParseRequest(ParseOptions):
     image: str  # Base64 encoded image (with or without data URL prefix)
 
 
@@ -53,28 +115,138 @@ class ParseResponse(BaseModel):
     winners: list[str]
     success: bool
     error: Optional[str] = None
-    debug_image: Optional[str] = None  # Base64 annotated image showing parsed regions
+    debug_image: Optional[str] = None  # Base64 WebP annotated image showing parsed regions
+
+
+def open_image(image_data: bytes) -> tuple[Image.Image, str]:
+    """Open image bytes as a PIL Image, along with their SHA-256 cache key."""
+    key = hashlib.sha256(image_data).hexdigest()
+    return Image.open(io.BytesIO(image_data)), key
+
+
+def decode_base64_image(base64_string: str) -> bytes:
+    """Decode a base64 string to image bytes."""
+    if len(base64_string) > MAX_BASE64_LENGTH:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    # Remove data URL prefix if present; index() stops at the first comma,
+    # and only the payload is copied rather than splitting the whole string
+    if base64_string.startswith("data:"):
+        base64_string = base64_string[base64_string.index(",", 5) + 1:]
+
+    return base64.b64decode(base64_string)
+
+
+def downscale_image(image: Image.Image) -> Image.Image:
+    """Shrink an image so its longest edge is at most MAX_IMAGE_EDGE."""
+    w, h = image.size
+    m = max(w, h)
+    if m <= MAX_IMAGE_EDGE:
+        return image
+    return image.resize((w * MAX_IMAGE_EDGE // m, h * MAX_IMAGE_EDGE // m), Image.LANCZOS)
 
 
-def decode_base64_image(base64_string: str) -> Image.Image:
-    """Decode a base64 string to PIL Image."""
-    # Remove data URL prefix if present
-    if "," in base64_string:
-        base64_string = base64_string.split(",")[1]
+def _body_validation_error(e: ValidationError) -> RequestValidationError:
+    """Convert a model ValidationError into FastAPI's 422 request body error."""
+    return RequestValidationError(
+        [{**err, "loc": ("body", *err["loc"])} for err in e.errors()]
+    )
 
-    image_data = base64.b64decode(base64_string)
-    return Image.open(io.BytesIO(image_data))
 
+def _reject_large_content_length(request: Request, limit: int):
+    """Raise 413 if the declared Content-Length is over limit, before reading the body."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail="Request body too large")
 
-def parse_with_scorebird(image: Image.Image, debug: bool = False) -> dict:
-    """Parse scorecard using the actual ScoreBird library."""
-    import tempfile
-    import cv2
-    import numpy as np
+
+async def _read_body_capped(request: Request, limit: int) -> bytes:
+    """Read the request body, raising 413 as soon as it grows past limit."""
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Request body too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def read_request_image(request: Request) -> tuple[bytes, ParseOptions]:
+    """
+    Read the encoded scorecard image bytes and parse options from a request.
+    Accepts a multipart upload in the "image" field (options as form fields),
+    or a JSON ParseRequest body.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        _reject_large_content_length(request, MAX_MULTIPART_BODY_BYTES)
+        # Starlette spools file parts to disk while parsing, and fills in upload.size
+        form = await request.form()
+        upload = form.get("image")
+        if upload is None or isinstance(upload, str):
+            raise RequestValidationError(
+                [{"type": "missing", "loc": ("body", "image"), "msg": "Field required", "input": None}]
+            )
+        # Check the size before loading the file into memory
+        if upload.size is not None and upload.size > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=413, detail="Image too large")
+        image_data = await upload.read()
+        if len(image_data) > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=413, detail="Image too large")
+        try:
+            options = ParseOptions(**{k: v for k, v in form.items() if k != "image"})
+        except ValidationError as e:
+            raise _body_validation_error(e)
+        return image_data, options
+
+    _reject_large_content_length(request, MAX_JSON_BODY_BYTES)
+    raw_body = await _read_body_capped(request, MAX_JSON_BODY_BYTES)
+    try:
+        # Parsing a multi-MB JSON body is CPU work, keep it off the event loop
+        data = await asyncio.to_thread(json.loads, raw_body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error", "input": {}}]
+        )
+    except UnicodeDecodeError:
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body",), "msg": "JSON decode error", "input": {}}]
+        )
+    if not isinstance(data, dict):
+        raise RequestValidationError(
+            [{"type": "model_type", "loc": ("body",), "msg": "Input should be an object", "input": data}]
+        )
+    try:
+        body = ParseRequest(**data)
+    except ValidationError as e:
+        raise _body_validation_error(e)
+    # Decoding a multi-MB base64 string is CPU work, keep it off the event loop
+    image_data = await asyncio.to_thread(decode_base64_image, body.image)
+    return image_data, body
+
+
+def parse_with_scorebird(
+    image: Image.Image,
+    debug: bool = False,
+    image_data: Optional[bytes] = None,
+    downscale: bool = False,
+) -> dict:
+    """
+    Parse scorecard using the actual ScoreBird library.
+    If image_data holds the encoded bytes of image, they are written out as-is.
+    If downscale is set, oversized images are shrunk first.
+    """
+    if downscale:
+        # A resized image has no format, so it is re-encoded below
+        image = downscale_image(image)
 
     # Save image to temp file (ScoreBird expects file path)
     with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-        image.save(tmp.name)
+        if image_data is not None and image.format in CV2_READABLE_FORMATS:
+            tmp.write(image_data)
+        else:
+            image.save(tmp, format="PNG")
         tmp_path = tmp.name
 
     try:
@@ -84,7 +256,6 @@ def parse_with_scorebird(image: Image.Image, debug: bool = False) -> dict:
             result = parse_scorebird_image(tmp_path)
             print(f"Parse result: {result}")
         except Exception as parse_err:
-            import traceback
             print(f"ScoreBird parse error: {parse_err}")
             traceback.print_exc()
             raise
@@ -108,10 +279,10 @@ def parse_with_scorebird(image: Image.Image, debug: bool = False) -> dict:
                     img_rgb = cv2.cvtColor(sb.img_scoreboard_bgr, cv2.COLOR_BGR2RGB)
                     debug_pil = Image.fromarray(img_rgb)
 
-                    # Convert to base64
+                    # Lossy WebP is far faster to encode than PNG and fine for debug visuals
                     buffer = io.BytesIO()
-                    debug_pil.save(buffer, format="PNG")
-                    debug_image_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+                    debug_pil.save(buffer, format="WEBP", quality=85, method=4)
+                    debug_image_b64 = base64.b64encode(buffer.getbuffer()).decode("ascii")
             except Exception as e:
                 print(f"Debug image generation failed: {e}")
 
@@ -125,14 +296,8 @@ def parse_with_scorebird(image: Image.Image, debug: bool = False) -> dict:
                 players.append({
                     "name": player_data.get("name") or player_key,
                     "scores": {
-                        "bird_points": details.get("bird_pts") or 0,
-                        "bonus": details.get("bonus_pts") or 0,
-                        "end_of_round": details.get("eor_pts") or 0,
-                        "egg": details.get("egg_pts") or 0,
-                        "cache": details.get("cache_pts") or 0,
-                        "tuck": details.get("tuck_pts") or 0,
-                        "nectar": details.get("nectar_pts") or 0,
-                        "duet_pts": details.get("duet_pts") or 0,
+                        score_key: details.get(detail_key) or 0
+                        for score_key, detail_key in SCORE_DETAIL_KEYS
                     },
                     "total": player_data.get("score") or 0,
                 })
@@ -167,26 +332,75 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.post("/parse", response_model=ParseResponse)
-async def parse_scorecard(request: ParseRequest):
+# parse_with_scorebird already returns the ParseResponse shape; FastAPI
+# validates and serializes the dict through the response model directly
+@app.post(
+    "/parse",
+    response_model=ParseResponse,
+    # The handler reads the raw request to accept both body types, so document them here
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": ParseRequest.model_json_schema()},
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "image": {"type": "string", "format": "binary"},
+                            **ParseOptions.model_json_schema()["properties"],
+                        },
+                        "required": ["image"],
+                    }
+                },
+            },
+        }
+    },
+)
+async def parse_scorecard(request: Request):
     """
     Parse a Wingspan scorecard image.
 
-    Expects a base64-encoded image (with or without data URL prefix).
-    Set debug=true to receive an annotated image showing parsed regions.
+    Expects either a multipart upload with an "image" file field, or a JSON
+    body with a base64-encoded image (with or without data URL prefix).
+    Set downscale=false to OCR oversized images at full resolution.
+    Set debug=true to receive an annotated WebP image showing parsed regions.
     Returns extracted player names, scores, and winners.
     """
     try:
         # Decode the image
-        image = decode_base64_image(request.image)
-
-        # Parse using ScoreBird
-        result = parse_with_scorebird(image, debug=True)
-
-        return ParseResponse(**result)
-
+        image_data, options = await read_request_image(request)
+        image, key = await asyncio.to_thread(open_image, image_data)
+        # Results differ by options, so cache each combination separately
+        key = f"{key}:{int(options.downscale)}:{int(options.debug)}"
+
+        result = _parse_cache.get(key)
+        if result is not None:
+            _parse_cache.move_to_end(key)
+        else:
+            # Parse using ScoreBird, off the event loop
+            result = await asyncio.get_running_loop().run_in_executor(
+                app.state.ocr_pool,
+                functools.partial(
+                    parse_with_scorebird,
+                    image,
+                    debug=options.debug,
+                    image_data=image_data,
+                    downscale=options.downscale,
+                ),
+            )
+            # Failures (e.g. unknown player names) can succeed after /register
+            # updates players.json, so only successful parses are cached
+            if result.get("success"):
+                _parse_cache[key] = result
+                if len(_parse_cache) > PARSE_CACHE_SIZE:
+                    _parse_cache.popitem(last=False)
+
+        return result
+
+    except (HTTPException, RequestValidationError):
+        raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(
             status_code=500,
@@ -196,4 +410,4 @@ async def parse_scorecard(request: ParseRequest):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
@@ -18,7 +18,8 @@ export async function POST(request: NextRequest) {
     const response = await fetch(`${SCOREBIRD_URL}/parse`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ image: body.image }),
+      // Request the annotated debug image shown in the upload preview
+      body: JSON.stringify({ image: body.image, debug: true }),
     });
 
     if (!response.ok) {
@@ -194,7 +194,7 @@ export function ImageUpload({
             )}
             <div className="relative">
               <img
-                src={showDebug && debugImage ? `data:image/png;base64,${debugImage}` : preview!}
+                src={showDebug && debugImage ? `data:image/webp;base64,${debugImage}` : preview!}
                 alt={showDebug ? "Debug view showing OCR regions" : "Score screenshot preview"}
                 className="max-h-96 w-full rounded-lg object-contain"
               />